@@ -1,12 +1,14 @@
+import binascii
 from machine import SPI, Pin
 from pn532_spi import PN532
 import time
 
-spi = SPI(1, baudrate=1000000, polarity=0, phase=0,
+spi = SPI(1, baudrate=5000000, polarity=0, phase=0,
           sck=Pin(10), mosi=Pin(11), miso=Pin(12))
 cs = Pin(13, Pin.OUT)
 pn532 = PN532(spi, cs, debug=False)
 
+pn532.negotiate_baudrate()
 pn532.SAM_configuration()
 
 print("Place NTAG215 on the antenna...")
@@ -23,5 +25,5 @@ for page in range(0, 135):
     if data is None:
         print("Failed to read page", page)
         break
-    print("Page {:03d}: {}".format(page, ' '.join('{:02X}'.format(b) for b in data)))
+    print("Page {:03d}: {}".format(page, binascii.hexlify(data, ' ').decode().upper()))
     #time.sleep_ms(10)
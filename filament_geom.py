@@ -0,0 +1,46 @@
+"""
+Spool and filament geometry helpers shared by the monitor and the
+tag-writing script. Diameters/widths are in millimetres, lengths in metres,
+weights in grams and densities in g/cm³.
+"""
+
+import math
+
+PI = math.pi
+TWO_PI = 2.0 * PI
+
+
+def filament_area_mm2(d_mm):
+    """Cross-sectional area of filament."""
+    return PI * (d_mm / 2) ** 2
+
+
+def compute_spool_length(min_d, max_d, width, filament_d, packing_factor=1.0):
+    """Estimate total length (m) if spool were full."""
+    r_core = min_d / 2
+    r_outer = max_d / 2
+    shell = r_outer**2 - r_core**2
+    if shell <= 0 or width <= 0:
+        return 0.0
+    area = filament_area_mm2(filament_d)
+    vol_mm3 = PI * width * shell
+    vol_mm3 *= packing_factor
+    length_m = vol_mm3 / area / 1000
+    return length_m
+
+
+def compute_weight_from_length(length_m, filament_d, density_g_cm3):
+    """Convert filament length (m) → weight (g)."""
+    area_mm2 = filament_area_mm2(filament_d)
+    vol_mm3 = area_mm2 * (length_m * 1000)
+    vol_cm3 = vol_mm3 / 1000.0
+    return vol_cm3 * density_g_cm3
+
+
+def compute_length_from_weight(weight_g, filament_d, density_g_cm3):
+    """Convert filament weight (g) → length (m)."""
+    vol_cm3 = weight_g / density_g_cm3
+    vol_mm3 = vol_cm3 * 1000.0
+    area_mm2 = filament_area_mm2(filament_d)
+    length_m = vol_mm3 / area_mm2 / 1000.0
+    return length_m
@@ -12,16 +12,24 @@ Expected JSON keys (all numeric values are floats in millimetres/grams/metres):
   ver, brand, type, fil_d, min_d, max_d, width,
   grams_full, grams_rem, meters_full, meters_rem
 
-Every full rotation subtracts filament based on current radius and updates the tag.
+Remaining grams/metres are also kept in a small dynamic record ("gr", "mr")
+that overrides grams_rem/meters_rem from the main record.
+
+Every full rotation subtracts filament based on current radius. The dynamic
+record on the tag is rewritten once WRITE_BACK_GRAMS of usage has built up,
+or when the tag stays in front of the reader (spool stopped) with unsaved
+usage.
 The display continuously cycles: filament type -> grams remaining -> metres remaining.
 """
 
 import math
+import micropython
 import time
 from machine import Pin, SPI
 from tm1637 import TM1637Decimal
 
 from pn532_spi import PN532
+from filament_geom import PI, TWO_PI, compute_spool_length, filament_area_mm2
 import tag_storage
 
 
@@ -31,7 +39,7 @@ DISPLAY_DIO = Pin(0)
 
 SPI_BUS = SPI(
     1,
-    baudrate=1_000_000,
+    baudrate=5_000_000,
     polarity=0,
     phase=0,
     sck=Pin(10),
@@ -43,66 +51,99 @@ PN532_CS = Pin(13, Pin.OUT)
 
 # --- Behaviour tuning ------------------------------------------------------
 FILAMENT_DIAMETER_MM = 1.75
-FILAMENT_AREA_MM2 = math.pi * (FILAMENT_DIAMETER_MM / 2) ** 2
+FILAMENT_AREA_MM2 = filament_area_mm2(FILAMENT_DIAMETER_MM)
+
+# Fallback density assumptions if metadata missing (PLA default):
+# 1.24 g/cm^3 * area (mm^2 -> cm^2) gives g/cm, times 100 for g/m.
+DEFAULT_GRAMS_PER_METER = 1.24 * (FILAMENT_AREA_MM2 / 100.0) * 100.0
 
 TAG_ABSENCE_MS = 5000  # minimum gap without tag before counting a rotation
 SCAN_TIMEOUT_MS = 100  # PN532 passive target timeout (ms)
 LOOP_DELAY_MS = 50     # main loop pause
 DISPLAY_INTERVAL_MS = 1000
+MPR_CACHE_DELTA_M = 1.0  # recompute metres-per-rotation after this much use
+WRITE_BACK_GRAMS = 5.0  # unsaved usage that forces a tag write
+IDLE_FLUSH_MS = TAG_ABSENCE_MS * 4  # flush early once the tag sits still in the field
 
 
 # --- Utility functions -----------------------------------------------------
-def length_from_radius(radius_mm, core_radius_mm, width_mm):
-    """Return remaining filament length (m) for a given outer radius."""
-    shell = max(radius_mm ** 2 - core_radius_mm ** 2, 0)
-    if shell <= 0 or width_mm <= 0:
-        return 0.0
-    volume_mm3 = math.pi * width_mm * shell
-    length_mm = volume_mm3 / FILAMENT_AREA_MM2
-    return length_mm / 1000.0
-
-
-def radius_from_length(length_m, core_radius_mm, width_mm, max_radius_mm):
-    """Convert remaining length (m) into an equivalent outer radius (mm)."""
+# The per-rotation helpers below are compiled with the native emitter.
+@micropython.native
+def radius_from_length(length_m, core_radius_mm, width_mm, max_radius_mm, seed_mm=None):
+    """Convert remaining length (m) into an equivalent outer radius (mm).
+
+    When ``seed_mm`` (the previous radius) is given, the square root is refined
+    with Newton-Raphson from that seed instead of calling ``math.sqrt``; the
+    radius only shrinks a little per rotation so one or two steps suffice.
+    """
     if width_mm <= 0:
         return core_radius_mm
     length_mm = max(length_m, 0) * 1000.0
-    shell = (length_mm * FILAMENT_AREA_MM2) / (math.pi * width_mm)
-    radius_sq = core_radius_mm ** 2 + shell
-    radius_mm = math.sqrt(max(radius_sq, core_radius_mm ** 2))
+    shell = (length_mm * FILAMENT_AREA_MM2) / (PI * width_mm)
+    core_sq = core_radius_mm * core_radius_mm
+    radius_sq = max(core_sq + shell, core_sq)
+    if seed_mm and radius_sq > 0:
+        radius_mm = 0.5 * (seed_mm + radius_sq / seed_mm)
+        if abs(radius_mm * radius_mm - radius_sq) > 1e-4 * radius_sq:
+            radius_mm = 0.5 * (radius_mm + radius_sq / radius_mm)
+    else:
+        radius_mm = math.sqrt(radius_sq)
     if max_radius_mm is not None:
         radius_mm = min(radius_mm, max_radius_mm)
     return radius_mm
 
 
+@micropython.native
 def meters_per_rotation(state):
-    """Approximate filament consumed per rotation based on current radius."""
+    """Approximate filament consumed per rotation based on current radius.
+
+    The result is cached in ``state`` and only recomputed once the remaining
+    length has moved by ``MPR_CACHE_DELTA_M`` since the last computation.
+    """
+    remaining_length = state["data"]["meters_rem"]
+    cached_at = state["_cached_meters_at"]
+    if cached_at is not None and abs(remaining_length - cached_at) < MPR_CACHE_DELTA_M:
+        return state["_cached_mpr"]
+
     core_radius = state["core_radius_mm"]
     max_radius = state["max_radius_mm"]
     width = state["width_mm"]
-    remaining_length = state["data"]["meters_rem"]
-    radius = radius_from_length(remaining_length, core_radius, width, max_radius)
+    radius = radius_from_length(
+        remaining_length, core_radius, width, max_radius, state["last_radius_mm"]
+    )
+    state["last_radius_mm"] = radius
     if radius <= 0:
-        return 0.0
-    circumference_mm = 2 * math.pi * radius
-    return max(circumference_mm / 1000.0, 0.0)
+        mpr = 0.0
+    else:
+        mpr = max(TWO_PI * radius * 0.001, 0.0)
+    state["_cached_mpr"] = mpr
+    state["_cached_meters_at"] = remaining_length
+    return mpr
 
 
 def grams_per_meter_from_data(data):
+    """Linear density (g/m) for a tag; only evaluated when a tag is loaded,
+    consume_filament_rotation uses the ``g_per_m`` value stored in state."""
     meters_full = data.get("meters_full", 0)
     grams_full = data.get("grams_full", 0)
     if meters_full > 0 and grams_full > 0:
         return grams_full / meters_full
-    # Fallback density assumptions if metadata missing (PLA default).
-    density = 1.24  # g/cm^3
-    area_mm2 = FILAMENT_AREA_MM2
-    area_cm2 = area_mm2 / 100.0  # convert mm^2 to cm^2
-    grams_per_mm = density * area_cm2
-    return grams_per_mm * 1000.0  # convert to grams per meter
+    return DEFAULT_GRAMS_PER_METER
 
 
+@micropython.native
 def clamp(value, minimum, maximum):
-    return max(minimum, min(value, maximum))
+    return minimum if value < minimum else (maximum if value > maximum else value)
+
+
+def same_uid(uid, current_uid):
+    """Compare a freshly read UID against the stored one without copying it."""
+    if current_uid is None or len(uid) != len(current_uid):
+        return False
+    for i in range(len(uid)):
+        if uid[i] != current_uid[i]:
+            return False
+    return True
 
 
 def normalise_tag_data(data):
@@ -123,7 +164,7 @@ def normalise_tag_data(data):
 
     meters_full = data.get("meters_full")
     if not meters_full or meters_full <= 0:
-        meters_full = length_from_radius(max_radius, core_radius, width)
+        meters_full = compute_spool_length(min_d, max_d, width, FILAMENT_DIAMETER_MM)
         data["meters_full"] = meters_full
 
     grams_full = data.get("grams_full")
@@ -135,6 +176,8 @@ def normalise_tag_data(data):
     data["meters_rem"] = clamp(data.get("meters_rem", meters_full), 0.0, meters_full)
 
     g_per_m = grams_per_meter_from_data(data)
+    # Display label for the "type" mode, padded/truncated to the 4 digits.
+    type_text = (str(data.get("type", "----")).upper() + "    ")[:4]
 
     return {
         "data": data,
@@ -142,12 +185,22 @@ def normalise_tag_data(data):
         "max_radius_mm": max_radius,
         "width_mm": width,
         "g_per_m": g_per_m,
+        "type_text": type_text,
+        "last_radius_mm": None,
+        "_cached_mpr": None,
+        "_cached_meters_at": None,
+        "pending_grams": 0.0,
     }
 
 
+@micropython.native
 def format_quantity(value, unit):
-    value_int = clamp(int(round(value)), 0, 999)
-    return "{:03d}.{}".format(value_int, unit)
+    # Three fixed digits, built directly rather than through str.format.
+    value = 0 if value < 0 else (999 if value > 999 else int(value + 0.5))
+    hundreds = value // 100
+    tens = (value // 10) % 10
+    ones = value % 10
+    return chr(48 + hundreds) + chr(48 + tens) + chr(48 + ones) + "." + unit
 
 
 # --- Display handling ------------------------------------------------------
@@ -158,15 +211,27 @@ class DisplayCycler:
         self._index = 0
         self._next_tick = time.ticks_add(time.ticks_ms(), DISPLAY_INTERVAL_MS)
         self._current_uid = None
-        self._last_payload = None
-        self._display.show("----")
+        self._last_shown = None
+        self._clear_last()
+        self._show("----")
+
+    def _clear_last(self):
+        self._last_mode = None
+        self._last_grams = None
+        self._last_meters = None
+
+    def _show(self, text):
+        # Skip the TM1637 transfer when the segments would not change.
+        if text != self._last_shown:
+            self._last_shown = text
+            self._display.show(text)
 
     def reset(self):
         self._current_uid = None
-        self._last_payload = None
+        self._clear_last()
         self._index = 0
         self._next_tick = time.ticks_add(time.ticks_ms(), DISPLAY_INTERVAL_MS)
-        self._display.show("----")
+        self._show("----")
 
     def update(self, uid, state):
         if not uid or not state:
@@ -185,22 +250,22 @@ class DisplayCycler:
             self._next_tick = time.ticks_add(now, DISPLAY_INTERVAL_MS)
 
         mode = self._modes[self._index]
-        payload = (mode, state["data"]["grams_rem"], state["data"]["meters_rem"])
-        if payload == self._last_payload:
+        data = state["data"]
+        grams = data["grams_rem"]
+        meters = data["meters_rem"]
+        if (mode == self._last_mode and grams == self._last_grams
+                and meters == self._last_meters):
             return
-        self._last_payload = payload
+        self._last_mode = mode
+        self._last_grams = grams
+        self._last_meters = meters
 
         if mode == "type":
-            filament_type = state["data"].get("type", "----")
-            text = (filament_type.upper() + "    ")[:4]
-            self._display.show(text)
-
+            self._show(state["type_text"])
         elif mode == "grams":
-            grams_text = format_quantity(state["data"]["grams_rem"], "G")
-            self._display.show(grams_text)
+            self._show(format_quantity(grams, "G"))
         else:
-            meters_text = format_quantity(state["data"]["meters_rem"], "L")
-            self._display.show(meters_text)
+            self._show(format_quantity(meters, "L"))
 
 
 # --- Main monitor ----------------------------------------------------------
@@ -209,25 +274,40 @@ def main():
     display_cycler = DisplayCycler(tm_display)
 
     pn532 = PN532(SPI_BUS, PN532_CS, debug=False)
+    try:
+        pn532.negotiate_baudrate()
+    except RuntimeError as err:
+        # Keep going at the slowest rate; the loop retries the reader anyway.
+        print("PN532 not detected at boot:", err)
     pn532.SAM_configuration()
 
     current_uid = None
     current_state = None
     last_seen_ms = 0
+    present_since_ms = None
     rotation_armed = False
     rotation_detected = False
 
     print("Filament monitor ready. Waiting for tags...")
 
+    # Bind the per-iteration callables to locals to skip attribute lookups.
+    ticks_ms = time.ticks_ms
+    ticks_diff = time.ticks_diff
+    sleep_ms = time.sleep_ms
+    read_passive = pn532.read_passive_target
+
     while True:
-        now = time.ticks_ms()
-        uid = pn532.read_passive_target(timeout=SCAN_TIMEOUT_MS)
-        uid_bytes = bytes(uid) if uid else None
+        now = ticks_ms()
+        uid = read_passive(timeout=SCAN_TIMEOUT_MS)
 
-        if uid_bytes:
-            if current_uid != uid_bytes:
+        if uid:
+            if present_since_ms is None:
+                present_since_ms = now
+            if not same_uid(uid, current_uid):
                 try:
                     data = tag_storage.read_ndef_json(pn532)
+                    if data is not None:
+                        apply_dynamic_record(data, tag_storage.read_dynamic(pn532))
                 except Exception as err:
                     print("Failed to read tag:", err)
                     data = None
@@ -241,7 +321,7 @@ def main():
                 else:
                     try:
                         current_state = normalise_tag_data(data)
-                        current_uid = uid_bytes
+                        current_uid = bytes(uid)
                         rotation_armed = False
                         rotation_detected = False
                         print("Loaded filament tag:", current_state["data"])
@@ -255,14 +335,22 @@ def main():
                 # Same tag reappeared
                 if current_state:
                     if rotation_detected:
-                        # Tag was gone long enough for a rotation, now write
+                        # Tag was gone long enough for a rotation, count it
                         consume_filament_rotation(pn532, current_state)
                         rotation_detected = False
+                    elif (current_state["pending_grams"] > 0
+                          and ticks_diff(now, present_since_ms) >= IDLE_FLUSH_MS):
+                        # Spool has stopped with the tag in range - save usage.
+                        # Restart the idle timer so a failing write is only
+                        # retried every IDLE_FLUSH_MS, not on every loop.
+                        flush_tag_write(pn532, current_state)
+                        present_since_ms = now
                     rotation_armed = True
             last_seen_ms = now
         else:
+            present_since_ms = None
             if current_uid:
-                gap = time.ticks_diff(now, last_seen_ms)
+                gap = ticks_diff(now, last_seen_ms)
                 if rotation_armed and gap >= TAG_ABSENCE_MS:
                     # Tag has been gone long enough - mark rotation detected
                     # but don't write yet, wait for tag to reappear
@@ -273,7 +361,17 @@ def main():
 
 
         display_cycler.update(current_uid, current_state)
-        time.sleep_ms(LOOP_DELAY_MS)
+        sleep_ms(LOOP_DELAY_MS)
+
+
+def apply_dynamic_record(data, dynamic):
+    """Overlay the remaining grams/metres from the dynamic tag record."""
+    if not dynamic:
+        return
+    if "gr" in dynamic:
+        data["grams_rem"] = dynamic["gr"]
+    if "mr" in dynamic:
+        data["meters_rem"] = dynamic["mr"]
 
 
 def consume_filament_rotation(pn532, state):
@@ -281,24 +379,42 @@ def consume_filament_rotation(pn532, state):
     if meters_step <= 0:
         return
 
-    grams_step = meters_step * state.get("g_per_m", grams_per_meter_from_data(state["data"]))
+    grams_step = meters_step * state["g_per_m"]
     data = state["data"]
-    data["meters_rem"] = max(data["meters_rem"] - meters_step, 0.0)
-    data["grams_rem"] = max(data["grams_rem"] - grams_step, 0.0)
-
+    meters = data["meters_rem"] - meters_step
+    grams = data["grams_rem"] - grams_step
     # Avoid negative values due to floating-point noise.
-    data["meters_rem"] = round(max(data["meters_rem"], 0.0), 3)
-    data["grams_rem"] = round(max(data["grams_rem"], 0.0), 3)
+    if meters < 0.0:
+        meters = 0.0
+    if grams < 0.0:
+        grams = 0.0
+    # Keep three decimals (rounded half up) without round()'s generic path.
+    data["meters_rem"] = int(meters * 1000 + 0.5) * 0.001
+    data["grams_rem"] = int(grams * 1000 + 0.5) * 0.001
+
+    print(
+        "Rotation consumed: -{:.3f} m, -{:.3f} g -> remaining {:.3f} m / {:.3f} g".format(
+            meters_step, grams_step, data["meters_rem"], data["grams_rem"]
+        )
+    )
+
+    # The in-memory values are authoritative; only write back to the tag
+    # once enough usage has accumulated to spare tag wear and SPI time.
+    state["pending_grams"] += grams_step
+    if state["pending_grams"] >= WRITE_BACK_GRAMS:
+        flush_tag_write(pn532, state)
+
 
+def flush_tag_write(pn532, state):
+    data = state["data"]
     try:
         print("Starting tag write...")
-        tag_storage.write_ndef_json(pn532, data)
-        print("Tag write complete.")
-        print(
-            "Rotation consumed: -{:.3f} m, -{:.3f} g -> remaining {:.3f} m / {:.3f} g".format(
-                meters_step, grams_step, data["meters_rem"], data["grams_rem"]
-            )
+        # Only the remaining amounts change; leave the static record alone.
+        tag_storage.write_dynamic(
+            pn532, {"gr": data["grams_rem"], "mr": data["meters_rem"]}
         )
+        state["pending_grams"] = 0.0
+        print("Tag write complete.")
     except Exception as err:
         print("Failed to update tag:", err)
 
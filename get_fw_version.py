@@ -1,7 +1,7 @@
 from machine import SPI, Pin
 from pn532_spi import PN532
 
-spi = SPI(1, baudrate=1000000, polarity=0, phase=0,
+spi = SPI(1, baudrate=5000000, polarity=0, phase=0,
           sck=Pin(10), mosi=Pin(11), miso=Pin(12))
 cs = Pin(13, Pin.OUT)
 
@@ -9,6 +9,7 @@ pn532 = PN532(spi, cs, debug=True)
 
 print("Getting firmware version...")
 try:
+    print("SPI baudrate:", pn532.negotiate_baudrate())
     fw = pn532.get_firmware_version()
     print("Firmware:", fw)
 except Exception as e:
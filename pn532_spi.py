@@ -72,6 +72,11 @@ _SPI_DATAWRITE = const(0x01)
 _SPI_DATAREAD = const(0x03)
 _SPI_READY = const(0x01)
 
+# IC byte reported by GetFirmwareVersion on a PN532.
+_PN532_IC = const(0x32)
+# SPI clock rates tried by PN532.negotiate_baudrate, fastest first.
+SPI_BAUDRATES = (5_000_000, 2_000_000, 1_000_000)
+
 
 def _reset(pin):
     """Perform a hardware reset toggle"""
@@ -100,6 +105,17 @@ def reverse_bit(num):
     return result
 
 
+# Bit-reversal lookup used by the preallocated NTAG READ path.
+_REVERSE = bytes(reverse_bit(i) for i in range(256))
+
+# InDataExchange READ reply: SPI status, preamble/start code, LEN, LCS,
+# D5 41 status + 16 data bytes, DCS, postamble (as _read_frame(19) reads).
+_READ4_RESPONSE_LEN = const(28)
+_READ4_FRAME_LEN = const(19)
+_READ4_CHECKSUM = (_PREAMBLE + _STARTCODE1 + _STARTCODE2 + _HOSTTOPN532
+                   + _COMMAND_INDATAEXCHANGE + 0x01 + MIFARE_CMD_READ)
+
+
 class PN532:
     """Driver for the PN532 connected over SPI. Pass in a hardware or bitbang
     SPI device & chip select digitalInOut pin. Optional IRQ pin (not used),
@@ -112,6 +128,11 @@ class PN532:
         self.CSB = cs_pin
         self._spi = spi
         self.CSB.on()
+        # Data checksum form this module sends: None until a valid one has
+        # been seen, then False (official) or True ("alt", official - 1).
+        self._alt_checksum = None
+        self._checksum_candidate = None
+        self._init_read4_buffers()
         if reset:
             if debug:
                 print("Resetting")
@@ -135,6 +156,35 @@ class PN532:
         self.CSB.on()  # pylint: disable=no-member
         time.sleep(1)
 
+    def _init_read4_buffers(self):
+        """Preallocate the frames used by ntag2xx_read_4pages_into."""
+        # DATAWRITE + _write_frame layout of D4 40 01 30 <page>; the page and
+        # DCS bytes (10 and 11) are filled in per call.
+        frame = (_SPI_DATAWRITE, _PREAMBLE, _STARTCODE1, _STARTCODE2,
+                 0x05, 0xFB, _HOSTTOPN532, _COMMAND_INDATAEXCHANGE, 0x01,
+                 MIFARE_CMD_READ, 0x00, 0x00, _POSTAMBLE)
+        self._read4_tx = bytearray(_REVERSE[b] for b in frame)
+        self._read4_ack_cmd = bytearray(len(_ACK) + 1)
+        self._read4_ack_cmd[0] = _REVERSE[_SPI_DATAREAD]
+        self._read4_ack = bytearray(len(_ACK) + 1)
+        self._read4_rx_cmd = bytearray(_READ4_RESPONSE_LEN)
+        self._read4_rx_cmd[0] = _REVERSE[_SPI_DATAREAD]
+        self._read4_rx = bytearray(_READ4_RESPONSE_LEN)
+        self._read4_mv = memoryview(self._read4_rx)
+
+    def _exchange(self, tx, rx=None):
+        """Clock a raw, already LSB-ified buffer over SPI with the same CS
+        timing as _write_data/_read_data, optionally reading into rx."""
+        time.sleep(0.02)   # required
+        self.CSB.off()
+        time.sleep_ms(2)
+        if rx is None:
+            self._spi.write(tx)
+        else:
+            self._spi.write_readinto(tx, rx)
+        time.sleep_ms(2)
+        self.CSB.on()
+
     def _wait_ready(self, timeout=1000):
         """Poll PN532 if status byte is ready, up to `timeout` milliseconds"""
         status_query = bytearray([reverse_bit(_SPI_STATREAD), 0])
@@ -265,8 +315,36 @@ class PN532:
                 )
             # Do NOT raise — some firmwares send 0x00 or ignore checksum entirely
             # We'll trust payload length since everything else matches
+        # Learn the checksum form for ntag2xx_read_4pages_into.
+        self._check_checksum(received_checksum, sum(frame_data))
         return frame_data
 
+    def _check_checksum(self, received, data_sum):
+        """Track which data checksum form this module sends and report
+        whether `received` is acceptable for a frame summing to `data_sum`.
+
+        Until a valid checksum (official or "alt") has been seen every frame
+        is accepted, matching _read_frame's tolerance of firmwares that send
+        0x00. Afterwards only the learned form is accepted, and switching to
+        the other form takes two frames in a row so one corrupted DCS that
+        happens to equal the other form can't flip the mode.
+        """
+        if received == (~data_sum + 1) & 0xFF:
+            alt = False
+        elif received == ~data_sum & 0xFF:
+            alt = True
+        else:
+            return self._alt_checksum is None
+        if alt == self._alt_checksum:
+            self._checksum_candidate = None
+            return True
+        if self._alt_checksum is None or self._checksum_candidate == alt:
+            self._alt_checksum = alt
+            self._checksum_candidate = None
+            return True
+        self._checksum_candidate = alt
+        return False
+
 
 
     def call_function(self, command, response_length=0, params=[], timeout=1000):  # pylint: disable=dangerous-default-value
@@ -320,6 +398,26 @@ class PN532:
             raise RuntimeError('Failed to detect the PN532')
         return tuple(response)
 
+    def negotiate_baudrate(self, baudrates=SPI_BAUDRATES, attempts=2):
+        """Probe the PN532 with GetFirmwareVersion, stepping the SPI bus down
+        through baudrates until it answers. Each rate is tried `attempts`
+        times since the first command after wakeup often fails. A probe only
+        counts if the reply carries the PN532 IC id. Returns the baudrate in
+        use, or raises RuntimeError (leaving the bus at the last rate tried).
+        """
+        for baudrate in baudrates:
+            self._spi.init(baudrate=baudrate)
+            for _ in range(attempts):
+                try:
+                    firmware = self.get_firmware_version()
+                except RuntimeError:
+                    continue
+                if firmware and firmware[0] == _PN532_IC:
+                    return baudrate
+            if self.debug:
+                print("DEBUG: no PN532 response at", baudrate)
+        raise RuntimeError('Failed to detect the PN532')
+
     def SAM_configuration(self):   # pylint: disable=invalid-name
         """Configure the PN532 to read MiFare cards."""
         # Send SAM configuration command with configuration for:
@@ -373,7 +471,8 @@ class PN532:
         response = self.call_function(_COMMAND_INDATAEXCHANGE,
                                       params=params,
                                       response_length=1)
-        return response[0] == 0x00
+        # No response (timeout) counts as a failed write, not an exception.
+        return response is not None and response[0] == 0x00
 
     def ntag2xx_read_block(self, page_number):
         """Read a 4-byte page from an NTAG2xx (e.g., NTAG213/215/216)."""
@@ -389,6 +488,75 @@ class PN532:
         return bytes(response[1:5])
 
 
+    def ntag2xx_read_4pages_into(self, page_number, timeout=1000, attempts=2):
+        """Read four NTAG2xx pages (16 bytes) starting at page_number into
+        preallocated buffers. Returns a memoryview of the data, valid only
+        until the next call, or None if the read failed or the frame did not
+        validate.
+
+        Once the module is known to send valid data checksums, a reply with
+        a bad DCS is re-read (up to `attempts` times) rather than returned,
+        so a flipped data bit never reaches the caller.
+        """
+        for _ in range(attempts):
+            data_start = self._read4_exchange(page_number, timeout)
+            if data_start < 0:
+                return None
+            data_end = data_start + _READ4_FRAME_LEN
+            rx = self._read4_rx
+            checksum = 0
+            for i in range(data_start, data_end):
+                checksum += rx[i]
+            if self._check_checksum(rx[data_end], checksum):
+                return self._read4_mv[data_start + 3:data_end]
+            if self.debug:
+                print("DEBUG: READ checksum mismatch at page", page_number)
+        return None
+
+    def _read4_exchange(self, page_number, timeout):
+        """Run one InDataExchange READ through the preallocated buffers.
+        Returns the index of the frame data (TFI) in _read4_rx, or -1."""
+        rev = _REVERSE
+        tx = self._read4_tx
+        page_number &= 0xFF
+        tx[10] = rev[page_number]
+        tx[11] = rev[~(_READ4_CHECKSUM + page_number) & 0xFF]
+        try:
+            self._exchange(tx)
+        except OSError:
+            self._wakeup()
+            return -1
+        if not self._wait_ready(timeout):
+            return -1
+
+        ack = self._read4_ack
+        self._exchange(self._read4_ack_cmd, ack)
+        for i in range(len(_ACK)):
+            if rev[ack[i + 1]] != _ACK[i]:
+                return -1
+        if not self._wait_ready(timeout):
+            return -1
+
+        rx = self._read4_rx
+        self._exchange(self._read4_rx_cmd, rx)
+        for i in range(1, _READ4_RESPONSE_LEN):
+            rx[i] = rev[rx[i]]
+
+        # Skip leading zeros up to the 0xFF start code, as _read_frame does.
+        idx = 1
+        while idx < _READ4_RESPONSE_LEN and rx[idx] == 0x00:
+            idx += 1
+        data_start = idx + 3
+        if data_start + _READ4_FRAME_LEN >= _READ4_RESPONSE_LEN or rx[idx] != _STARTCODE2:
+            return -1
+        if rx[idx + 1] != _READ4_FRAME_LEN or (rx[idx + 1] + rx[idx + 2]) & 0xFF:
+            return -1
+        if rx[data_start] != _PN532TOHOST or rx[data_start + 1] != _RESPONSE_INDATAEXCHANGE:
+            return -1
+        if rx[data_start + 2] != 0x00:
+            return -1
+        return data_start
+
     def mifare_classic_read_block(self, block_number):
         """Read a block of data from the card.  Block number should be the block
         to read.  If the block is successfully read a bytearray of length 16 with
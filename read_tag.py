@@ -2,11 +2,12 @@ from machine import SPI, Pin
 from pn532_spi import PN532
 import time
 
-spi = SPI(1, baudrate=1000000, polarity=0, phase=0,
+spi = SPI(1, baudrate=5000000, polarity=0, phase=0,
           sck=Pin(10), mosi=Pin(11), miso=Pin(12))
 cs = Pin(13, Pin.OUT)
 pn532 = PN532(spi, cs, debug=False)
 
+print("SPI baudrate:", pn532.negotiate_baudrate())
 print("Firmware:", pn532.get_firmware_version())
 print("Configuring SAM...")
 pn532.SAM_configuration()  # <--- this turns on the RF field
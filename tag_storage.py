@@ -1,119 +1,173 @@
 """
 Utility helpers for storing filament metadata on NTAG215 tags using
 an NDEF Text record that carries a JSON payload.
+Volatile values live in a small JSON record at a reserved page offset
+(see write_dynamic / read_dynamic) so they can be rewritten cheaply.
 Designed for MicroPython on Raspberry Pi Pico.
 """
 
-import time
 import ujson
 
 NDEF_TLV = 0x03
 TERMINATOR_TLV = 0xFE
 START_PAGE = 4
 MAX_PAGE = 134  # inclusive
+# Pages 106-129 (the top of NTAG215 user memory) hold the values that change
+# on every rotation, so the static NDEF record below them only has to be
+# written once. The area is split into two slots used alternately; each holds
+# a proprietary TLV of [sequence, JSON..., checksum], and the newest valid
+# slot wins, so a write cut short never destroys the previous record.
+DYNAMIC_PAGE = 106
+DYNAMIC_PAGES = 12  # per slot
+DYNAMIC_SLOTS = (DYNAMIC_PAGE, DYNAMIC_PAGE + DYNAMIC_PAGES)
+PROPRIETARY_TLV = 0xFD
+DEBUG = False  # print raw TLV/record dumps while reading
+PAGES_PER_READ = 4  # NTAG2xx READ returns 16 bytes (4 pages) per command
+WRITE_RETRIES = 3  # attempts per page before giving up
 
 
 def _encode_text_record(text, language="en"):
     text_bytes = text.encode("utf-8")
     lang_bytes = language.encode("ascii")
-    if len(lang_bytes) > 0x3F:
+    lang_length = len(lang_bytes)
+    if lang_length > 0x3F:
         raise ValueError("Language code too long")
-    status = len(lang_bytes) & 0x3F  # UTF-8 encoding flag cleared
-    payload = bytes([status]) + lang_bytes + text_bytes
-    if len(payload) > 0xFFFF:
+    payload_length = 1 + lang_length + len(text_bytes)
+    if payload_length > 0xFFFF:
         raise ValueError("Payload too large for NDEF record")
 
+    short_record = payload_length <= 0xFF
     header = 0xD1  # MB=1, ME=1, SR=1, TNF=0x1 (well-known)
-    if len(payload) > 0xFF:
+    length_size = 1
+    if not short_record:
         header = 0xC1  # switch off short record flag for extended payload
-    record = bytearray([header, 0x01])
+        length_size = 4
 
-    if len(payload) > 0xFF:
-        record.extend(len(payload).to_bytes(4, "big"))
+    # Size the record once and fill it in place.
+    record = bytearray(3 + length_size + payload_length)
+    record[0] = header
+    record[1] = 0x01  # type length
+    idx = 2
+    if short_record:
+        record[idx] = payload_length
     else:
-        record.append(len(payload))
-
-    record.append(ord("T"))
-    record.extend(payload)
-    return bytes(record)
+        record[idx:idx + 4] = payload_length.to_bytes(4, "big")
+    idx += length_size
+    record[idx] = ord("T")
+    record[idx + 1] = lang_length & 0x3F  # UTF-8 encoding flag cleared
+    idx += 2
+    record[idx:idx + lang_length] = lang_bytes
+    idx += lang_length
+    record[idx:] = text_bytes
+    return record
 
 
 def _decode_text_record(message):
-    print("DEBUG header:", hex(message[0]), "len:", len(message))
-
     if not message:
         return None
-    header = message[0]
+    if DEBUG:
+        print("DEBUG header:", hex(message[0]), "len:", len(message))
+
+    # Slice through a memoryview so the record fields are not copied.
+    mv = memoryview(message)
+    header = mv[0]
     short_record = (header & 0x10) == 0x10
     has_id = (header & 0x08) == 0x08
     if (header & 0x07) != 0x01:
         return None
 
-    type_length = message[1]
+    type_length = mv[1]
     idx = 2
     if short_record:
-        payload_length = message[idx]
+        payload_length = mv[idx]
         idx += 1
     else:
-        payload_length = int.from_bytes(message[idx:idx+4], "big")
+        payload_length = int.from_bytes(mv[idx:idx+4], "big")
         idx += 4
 
-    record_type = message[idx:idx + type_length]
+    record_type = mv[idx] if type_length == 1 else None
     idx += type_length
 
     if has_id:
-        if idx >= len(message):
+        if idx >= len(mv):
             return None
-        id_length = message[idx]
+        id_length = mv[idx]
         idx += 1 + id_length
 
-    if record_type != b"T":
+    if record_type != ord("T"):
         return None
 
-    payload = message[idx:idx + payload_length]
-    if not payload:
+    payload = mv[idx:idx + payload_length]
+    if not len(payload):
         return ""
 
     status = payload[0]
     lang_length = status & 0x3F
-    text = payload[1 + lang_length:]
-    return text.decode("utf-8")
+    return str(payload[1 + lang_length:], "utf-8")
 
 
 def _encode_tlv(record_bytes):
+    """Wrap a record in an NDEF TLV, padded to a whole number of pages."""
     length = len(record_bytes)
-    tlv = bytearray()
-    tlv.append(NDEF_TLV)
-    if length > 0xFE:
-        tlv.append(0xFF)
-        tlv.extend(length.to_bytes(2, "big"))
+    header_size = 4 if length > 0xFE else 2
+    used = header_size + length + 1  # + terminator
+    pad = (4 - used % 4) % 4
+    tlv = bytearray(used + pad)  # padding stays zeroed (NULL TLVs)
+    tlv[0] = NDEF_TLV
+    if header_size == 4:
+        tlv[1] = 0xFF
+        tlv[2] = (length >> 8) & 0xFF
+        tlv[3] = length & 0xFF
     else:
-        tlv.append(length)
-    tlv.extend(record_bytes)
-    tlv.append(TERMINATOR_TLV)
+        tlv[1] = length
+    tlv[header_size:header_size + length] = record_bytes
+    tlv[header_size + length] = TERMINATOR_TLV
     return tlv
 
 
+def _tlv_pages(header):
+    """Return the page count covered by the NDEF TLV starting at ``header``."""
+    tlv_len = header[1]
+    header_size = 2
+    if tlv_len == 0xFF:
+        tlv_len = (header[2] << 8) | header[3]
+        header_size = 4
+    return (header_size + tlv_len + 1 + 3) // 4  # + terminator, round up
+
+
 def read_ndef_json(pn532, start_page=START_PAGE, max_pages=80):
     """Return JSON data stored in the first NDEF Text record or None."""
-    print("DEBUG start_page:", start_page, "max_pages:", max_pages)
+    if DEBUG:
+        print("DEBUG start_page:", start_page, "max_pages:", max_pages)
     raw = bytearray()
     end_page = min(MAX_PAGE, start_page + max_pages)
-    for page in range(start_page, end_page + 1):
-        block = pn532.ntag2xx_read_block(page)
+    page = start_page
+    sized = False
+    while page <= end_page:
+        block = pn532.ntag2xx_read_4pages_into(page)
         if block is None:
             break
-        raw.extend(block)
-        if TERMINATOR_TLV in block:
+        if page == start_page and block[0] == NDEF_TLV:
+            # The TLV header tells us exactly how many pages to fetch.
+            end_page = min(end_page, start_page + _tlv_pages(block) - 1)
+            sized = True
+        # READ wraps around past the last page; drop anything beyond end_page.
+        pages = min(PAGES_PER_READ, end_page + 1 - page)
+        raw.extend(block[:pages * 4])
+        if not sized and TERMINATOR_TLV in raw:
             break
+        page += PAGES_PER_READ
 
     if not raw:
-        print("DEBUG no raw data read")
+        if DEBUG:
+            print("DEBUG no raw data read")
         return None
 
+    raw_mv = memoryview(raw)
     idx = 0
     length = len(raw)
-    print("DEBUG total raw length:", length)
+    if DEBUG:
+        print("DEBUG total raw length:", length)
     while idx < length:
         tlv_type = raw[idx]
         if tlv_type == 0x00:
@@ -132,13 +186,10 @@ def read_ndef_json(pn532, start_page=START_PAGE, max_pages=80):
                     break
                 tlv_len = (raw[idx] << 8) | raw[idx + 1]
                 idx += 2
-            message = raw[idx:idx + tlv_len]
-
-
-            print("DEBUG raw TLV:", [hex(b) for b in raw[:32]])
-            print("DEBUG message:", [hex(b) for b in message[:32]])
-
-
+            message = raw_mv[idx:idx + tlv_len]
+            if DEBUG:
+                print("DEBUG raw TLV:", [hex(b) for b in raw[:32]])
+                print("DEBUG message:", [hex(b) for b in message[:32]])
 
         text = _decode_text_record(message)
         if not text:
@@ -150,7 +201,8 @@ def read_ndef_json(pn532, start_page=START_PAGE, max_pages=80):
         try:
             return ujson.loads(text)
         except Exception as e:
-            print("DEBUG raw text snippet:", text[:80])
+            if DEBUG:
+                print("DEBUG raw text snippet:", text[:80])
             raise e
 
         else:
@@ -159,32 +211,135 @@ def read_ndef_json(pn532, start_page=START_PAGE, max_pages=80):
     return None
 
 
+def _write_pages(pn532, start_page, buf):
+    """Write a page-aligned buffer to consecutive pages from ``start_page``."""
+    page = start_page
+    offset = 0
+    while offset < len(buf):
+        block = buf[offset:offset + 4]
+        # The PN532 only answers once the tag has acknowledged the write, so
+        # no settling delay is needed; retry instead if a page is rejected.
+        for _ in range(WRITE_RETRIES):
+            try:
+                if pn532.ntag2xx_write_block(page, block):
+                    break
+            except RuntimeError:
+                # Missed ACK or malformed reply; retry the page.
+                pass
+        else:
+            raise RuntimeError("Failed to write page {}".format(page))
+        page += 1
+        offset += 4
+    return len(buf) // 4
+
+
 def write_ndef_json(pn532, data, start_page=START_PAGE):
     """Write JSON data into the first NDEF Text record."""
     text = ujson.dumps(data)
     record = _encode_text_record(text)
     tlv = _encode_tlv(record)
 
-    # Pad to 4-byte boundaries for NTAG writes.
-    if len(tlv) % 4:
-        padding = 4 - (len(tlv) % 4)
-        tlv.extend(b"\x00" * padding)
-
     total_pages = len(tlv) // 4
     end_page = start_page + total_pages
-    if end_page > MAX_PAGE + 1:
+    if end_page > DYNAMIC_PAGE:
         raise ValueError("Data does not fit on tag")
 
-    page = start_page
-    offset = 0
-    while offset < len(tlv):
-        block = tlv[offset:offset + 4]
-        success = pn532.ntag2xx_write_block(page, block)
-        if not success:
-            raise RuntimeError("Failed to write page {}".format(page))
-        time.sleep_ms(5)
-        page += 1
-        offset += 4
+    return _write_pages(pn532, start_page, tlv)
 
-    return total_pages
 
+def _dynamic_checksum(seq, text):
+    checksum = seq
+    for b in text:
+        checksum += b
+    return checksum & 0xFF
+
+
+def _read_slot(pn532, start_page):
+    """Return (seq, values) for a dynamic slot, None if the slot is empty,
+    or False if it holds a damaged record. Raises RuntimeError when the tag
+    cannot be read."""
+    raw = bytearray()
+    needed = 2
+    page = start_page
+    while len(raw) < needed and page < start_page + DYNAMIC_PAGES:
+        block = pn532.ntag2xx_read_4pages_into(page)
+        if block is None:
+            raise RuntimeError("Failed to read page {}".format(page))
+        raw.extend(block)
+        if page == start_page:
+            if raw[0] != PROPRIETARY_TLV:
+                return None
+            needed = 2 + raw[1]
+        page += PAGES_PER_READ
+    if len(raw) < needed or raw[1] < 2:
+        return False
+
+    mv = memoryview(raw)
+    seq = raw[2]
+    text = mv[3:needed - 1]
+    if raw[needed - 1] != _dynamic_checksum(seq, text):
+        return False
+    try:
+        return seq, ujson.loads(str(text, "utf-8"))
+    except ValueError:
+        return False
+
+
+def _read_slots(pn532):
+    return [_read_slot(pn532, start) for start in DYNAMIC_SLOTS]
+
+
+def _newest_slot(slots):
+    """Index of the valid slot with the newest sequence number, or None."""
+    best = None
+    for i, slot in enumerate(slots):
+        if not slot:
+            continue
+        # Sequence numbers wrap at 256; "newer" means ahead by < 128.
+        if best is None or (slot[0] - slots[best][0]) & 0xFF < 0x80:
+            best = i
+    return best
+
+
+def write_dynamic(pn532, values):
+    """Write the small, frequently changing JSON record (e.g. remaining
+    grams/metres) into the dynamic slot not holding the current record.
+    The slot's first page, which carries the TLV header, is written last."""
+    text = ujson.dumps(values).encode("utf-8")
+    length = len(text) + 2  # sequence + checksum
+    used = 2 + length + 1
+    if used > DYNAMIC_PAGES * 4:
+        raise ValueError("Dynamic record too large")
+
+    slots = _read_slots(pn532)
+    current = _newest_slot(slots)
+    if current is None:
+        target, seq = 0, 0
+    else:
+        target, seq = 1 - current, (slots[current][0] + 1) & 0xFF
+
+    buf = bytearray(used + (4 - used % 4) % 4)
+    buf[0] = PROPRIETARY_TLV
+    buf[1] = length
+    buf[2] = seq
+    buf[3:3 + len(text)] = text
+    buf[used - 2] = _dynamic_checksum(seq, text)
+    buf[used - 1] = TERMINATOR_TLV
+
+    start = DYNAMIC_SLOTS[target]
+    pages = _write_pages(pn532, start + 1, memoryview(buf)[4:])
+    return pages + _write_pages(pn532, start, memoryview(buf)[:4])
+
+
+def read_dynamic(pn532):
+    """Return the newest record written by ``write_dynamic`` or None if the
+    tag has none. Raises RuntimeError if the tag cannot be read or only
+    damaged records are present, so callers don't mistake either for a
+    missing record."""
+    slots = _read_slots(pn532)
+    current = _newest_slot(slots)
+    if current is not None:
+        return slots[current][1]
+    if slots[0] is None and slots[1] is None:
+        return None
+    raise RuntimeError("Corrupt dynamic record")
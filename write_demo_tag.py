@@ -4,9 +4,13 @@ Supports a standard table for filament materials (PLA, PETG, TPU),
 and allows starting with used spools (enter current grams).
 """
 
-import math
 from machine import SPI, Pin
 from pn532_spi import PN532
+from filament_geom import (
+    compute_length_from_weight,
+    compute_spool_length,
+    compute_weight_from_length,
+)
 import tag_storage
 
 
@@ -34,41 +38,8 @@ FILAMENT_DIAMETER_MM = 1.75
 
 
 # ---------------------------------------------------------------------------
-# COMPUTATION FUNCTIONS
+# HELPERS
 # ---------------------------------------------------------------------------
-def filament_area_mm2(d_mm):
-    """Cross-sectional area of filament."""
-    return math.pi * (d_mm / 2) ** 2
-
-
-def compute_spool_length(min_d, max_d, width, filament_d, packing_factor):
-    """Estimate total length (m) if spool were full."""
-    r_core = min_d / 2
-    r_outer = max_d / 2
-    area = filament_area_mm2(filament_d)
-    vol_mm3 = math.pi * width * (r_outer**2 - r_core**2)
-    vol_mm3 *= packing_factor
-    length_m = vol_mm3 / area / 1000
-    return length_m
-
-
-def compute_weight_from_length(length_m, filament_d, density_g_cm3):
-    """Convert filament length (m) → weight (g)."""
-    area_mm2 = filament_area_mm2(filament_d)
-    vol_mm3 = area_mm2 * (length_m * 1000)
-    vol_cm3 = vol_mm3 / 1000.0
-    return vol_cm3 * density_g_cm3
-
-
-def compute_length_from_weight(weight_g, filament_d, density_g_cm3):
-    """Convert filament weight (g) → length (m)."""
-    vol_cm3 = weight_g / density_g_cm3
-    vol_mm3 = vol_cm3 * 1000.0
-    area_mm2 = filament_area_mm2(filament_d)
-    length_m = vol_mm3 / area_mm2 / 1000.0
-    return length_m
-
-
 def wait_for_tag(pn532):
     print("Place an NTAG215 tag on the reader to program...")
     uid = None
@@ -104,7 +75,7 @@ def main():
     # Setup PN532
     spi = SPI(
         1,
-        baudrate=1_000_000,
+        baudrate=5_000_000,
         polarity=0,
         phase=0,
         sck=Pin(10),
@@ -113,6 +84,7 @@ def main():
     )
     cs = Pin(13, Pin.OUT)
     pn532 = PN532(spi, cs, debug=False)
+    pn532.negotiate_baudrate()
     pn532.SAM_configuration()
 
     uid = wait_for_tag(pn532)
@@ -134,6 +106,8 @@ def main():
 
     try:
         tag_storage.write_ndef_json(pn532, tag_payload)
+        # Reset the dynamic record so stale values don't override the new ones.
+        tag_storage.write_dynamic(pn532, {"gr": GRAMS_REMAIN, "mr": meters_rem})
         print("Tag written successfully.")
         print("Payload:", tag_payload)
     except Exception as err: